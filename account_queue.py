@@ -0,0 +1,351 @@
+# account_queue.py
+import argparse
+import csv
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+
+import config
+
+# ==============================================================================
+# A lease-based work queue so any number of workers, on any number of machines,
+# can split a large account set. The queue is one SQLite file; put it on storage
+# every worker can reach. It uses SQLite's rollback journal (not WAL) because WAL
+# needs shared memory and is unsafe on network filesystems.
+#
+#   pending --lease--> leased --complete(ok)--> done
+#                        |  \--complete(fail)--> pending (retry) / failed (max attempts)
+#                        \--lease expired (worker died)--> leased again by another worker
+# ==============================================================================
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS queue (
+    batch TEXT NOT NULL,
+    site TEXT NOT NULL,
+    username TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    lease_owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    enqueued_at REAL NOT NULL,
+    PRIMARY KEY (batch, site, username)
+);
+CREATE INDEX IF NOT EXISTS idx_queue_status ON queue (batch, status, lease_expires);
+
+CREATE TABLE IF NOT EXISTS completions (
+    batch TEXT NOT NULL,
+    site TEXT NOT NULL,
+    username TEXT NOT NULL,
+    worker TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    attempts INTEGER NOT NULL,
+    duration REAL NOT NULL,
+    finished_at REAL NOT NULL,
+    PRIMARY KEY (batch, site, username)
+);
+"""
+
+
+class Account:
+    """One set of credentials for one site."""
+
+    def __init__(self, site: str, username: str, password: str | None):
+        self.site = site
+        self.username = username
+        self.password = password
+
+    @property
+    def key(self) -> str:
+        return f"{self.site}:{self.username}"
+
+    @property
+    def bucket(self) -> int:
+        """Stable hash used for sharding; identical on every machine and Python process."""
+        return zlib.crc32(self.key.encode("utf-8"))
+
+
+def load_accounts(path: str) -> list[Account]:
+    """
+    Reads accounts from a CSV file with the columns: site, username, password, password_env.
+
+    Either password or password_env (the name of an environment variable holding
+    the password, e.g. a GitHub Secret) must be given for each row.
+    """
+    accounts = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for line_number, row in enumerate(csv.DictReader(f), start=2):
+            site = (row.get("site") or "").strip()
+            username = (row.get("username") or "").strip()
+            if not site or not username:
+                raise ValueError(f"{path}:{line_number}: 'site' and 'username' are required.")
+            password = row.get("password") or None
+            password_env = (row.get("password_env") or "").strip()
+            if not password and password_env:
+                password = os.getenv(password_env)
+            accounts.append(Account(site, username, password))
+    return accounts
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parses 'i/N' (0-based shard index i of N shards)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Shard must look like 'i/N', got '{value}'")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"Shard index must be in [0, {count}), got {index}")
+    return index, count
+
+
+def in_shard(account: Account, shard: tuple[int, int] | None) -> bool:
+    return shard is None or account.bucket % shard[1] == shard[0]
+
+
+def default_batch() -> str:
+    """One batch per UTC day, so every morning's run is a fresh set of work."""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class AccountQueue:
+    """SQLite-backed queue of accounts for one batch. Every method is a single short transaction."""
+
+    def __init__(self, db_path: str, batch: str, lease_seconds: float = None, max_attempts: int = None,
+                 create: bool = True):
+        self.db_path = db_path
+        self.batch = batch
+        self.lease_seconds = lease_seconds or config.QUEUE_LEASE_SECONDS
+        self.max_attempts = max_attempts or config.QUEUE_MAX_ATTEMPTS
+        if not create:
+            return # Read-only use (e.g. the coordinator summary): never create the file
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        if read_only:
+            uri = Path(os.path.abspath(self.db_path)).as_uri() + "?mode=ro"
+            return sqlite3.connect(uri, uri=True, timeout=config.QUEUE_BUSY_TIMEOUT)
+        # isolation_level=None: transactions are opened explicitly with BEGIN IMMEDIATE
+        return sqlite3.connect(self.db_path, timeout=config.QUEUE_BUSY_TIMEOUT, isolation_level=None)
+
+    def _transaction(self):
+        return _Transaction(self._connect())
+
+    def enqueue(self, accounts: list[Account]) -> int:
+        """Adds accounts to the batch. Idempotent, so every worker may call it on start-up."""
+        now = time.time()
+        with self._transaction() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO queue (batch, site, username, bucket, enqueued_at) VALUES (?, ?, ?, ?, ?)",
+                [(self.batch, a.site, a.username, a.bucket, now) for a in accounts],
+            )
+            return conn.total_changes - before
+
+    def lease(self, worker: str, shard: tuple[int, int] | None = None, known=None) -> tuple[str, str] | None:
+        """
+        Claims the next available account for this worker.
+
+        Accounts whose lease has expired (their worker died or hung) are available again.
+        If `known` (a collection of "site:username" keys) is given, other accounts are left
+        for workers whose accounts file has their credentials.
+
+        Returns:
+            (site, username), or None when nothing is available to this worker right now.
+            Use next_lease_expiry() to tell "finished" from "wait for other workers".
+        """
+        now = time.time()
+        shard_clause, shard_args = ("AND bucket % ? = ?", [shard[1], shard[0]]) if shard else ("", [])
+        with self._transaction() as conn:
+            # Expired leases that already used every attempt are given up on
+            conn.execute(
+                "INSERT OR IGNORE INTO completions (batch, site, username, worker, success, attempts, duration, finished_at)"
+                " SELECT batch, site, username, lease_owner, 0, attempts, 0, ? FROM queue"
+                " WHERE batch = ? AND status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.batch, now, self.max_attempts),
+            )
+            conn.execute(
+                "UPDATE queue SET status = 'failed', lease_owner = NULL"
+                " WHERE batch = ? AND status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (self.batch, now, self.max_attempts),
+            )
+            candidates = conn.execute(
+                "SELECT site, username, status, lease_owner FROM queue"
+                " WHERE batch = ? AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) "
+                + shard_clause + " ORDER BY attempts, enqueued_at",
+                [self.batch, now, *shard_args],
+            )
+            for site, username, status, previous_owner in candidates:
+                if known is None or f"{site}:{username}" in known:
+                    break
+            else:
+                return None
+            if status == "leased":
+                logging.warning(f"Re-queuing {site}:{username}: lease held by {previous_owner} expired.")
+            conn.execute(
+                "UPDATE queue SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1"
+                " WHERE batch = ? AND site = ? AND username = ?",
+                (worker, now + self.lease_seconds, self.batch, site, username),
+            )
+            return site, username
+
+    def next_lease_expiry(self, shard: tuple[int, int] | None = None, known=None) -> float | None:
+        """
+        Earliest expiry among leases other workers still hold in this batch (and shard).
+
+        Returns:
+            A timestamp, or None when no leases are outstanding and the batch is finished for this worker.
+        """
+        shard_clause, shard_args = ("AND bucket % ? = ?", [shard[1], shard[0]]) if shard else ("", [])
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT site, username, lease_expires FROM queue WHERE batch = ? AND status = 'leased' " + shard_clause,
+                [self.batch, *shard_args],
+            ).fetchall()
+        finally:
+            conn.close()
+        expiries = [expires for site, username, expires in rows if known is None or f"{site}:{username}" in known]
+        return min(expiries) if expiries else None
+
+    def renew(self, worker: str, site: str, username: str) -> bool:
+        """Extends a lease this worker still holds. Returns False if it was lost."""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE queue SET lease_expires = ? WHERE batch = ? AND site = ? AND username = ?"
+                " AND status = 'leased' AND lease_owner = ?",
+                (time.time() + self.lease_seconds, self.batch, site, username, worker),
+            )
+            return cursor.rowcount == 1
+
+    def complete(self, worker: str, site: str, username: str, success: bool, duration: float) -> bool:
+        """
+        Finishes a lease. A failed attempt goes back to pending until max_attempts is reached.
+
+        The completion record is written at most once per account and batch, and only
+        by the worker that still holds the lease.
+
+        Returns:
+            False if the lease had already been lost to another worker.
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT attempts FROM queue WHERE batch = ? AND site = ? AND username = ?"
+                " AND status = 'leased' AND lease_owner = ?",
+                (self.batch, site, username, worker),
+            ).fetchone()
+            if row is None:
+                return False
+            attempts = row[0]
+            if not success and attempts < self.max_attempts:
+                status = "pending"
+            else:
+                status = "done" if success else "failed"
+                conn.execute(
+                    "INSERT OR IGNORE INTO completions (batch, site, username, worker, success, attempts, duration, finished_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.batch, site, username, worker, int(success), attempts, duration, time.time()),
+                )
+            conn.execute(
+                "UPDATE queue SET status = ?, lease_owner = NULL, lease_expires = NULL"
+                " WHERE batch = ? AND site = ? AND username = ?",
+                (status, self.batch, site, username),
+            )
+            return True
+
+    def summary(self) -> dict:
+        """Batch-wide progress for the coordinator: status counts, per-worker totals and throughput. Read-only."""
+        conn = self._connect(read_only=True)
+        try:
+            statuses = dict(conn.execute(
+                "SELECT status, COUNT(*) FROM queue WHERE batch = ? GROUP BY status", (self.batch,)
+            ).fetchall())
+            workers = conn.execute(
+                "SELECT worker, COUNT(*), SUM(success), AVG(duration) FROM completions"
+                " WHERE batch = ? GROUP BY worker ORDER BY worker",
+                (self.batch,),
+            ).fetchall()
+            first, last, finished = conn.execute(
+                "SELECT MIN(finished_at - duration), MAX(finished_at), COUNT(*) FROM completions WHERE batch = ?",
+                (self.batch,),
+            ).fetchone()
+        finally:
+            conn.close()
+        elapsed = (last - first) if finished else 0.0
+        return {
+            "batch": self.batch,
+            "total": sum(statuses.values()),
+            "statuses": statuses,
+            "workers": workers,
+            "elapsed": elapsed,
+            "per_minute": finished / (elapsed / 60) if elapsed > 0 else 0.0,
+        }
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT on a fresh connection; takes the write lock up front to avoid deadlocks."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        finally:
+            self.conn.close()
+
+
+class LeaseKeeper:
+    """Renews a lease in the background while a long update runs."""
+
+    def __init__(self, queue: AccountQueue, worker: str, site: str, username: str):
+        self._queue = queue
+        self._args = (worker, site, username)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self._queue.lease_seconds / 3):
+            try:
+                if not self._queue.renew(*self._args):
+                    logging.warning(f"Lost lease on {self._args[1]}:{self._args[2]}; another worker may pick it up.")
+                    return
+            except sqlite3.Error as e:
+                logging.warning(f"Could not renew lease on {self._args[1]}:{self._args[2]}: {e}")
+
+
+def print_summary(summary: dict):
+    statuses = summary["statuses"]
+    print(f"Batch {summary['batch']}: {summary['total']} accounts")
+    for status in ("pending", "leased", "done", "failed"):
+        print(f"  {status:<8} {statuses.get(status, 0)}")
+    print(f"Throughput: {summary['per_minute']:.1f} accounts/min over {summary['elapsed'] / 60:.1f} min")
+    for worker, finished, succeeded, avg_duration in summary["workers"]:
+        print(f"  {worker:<40} finished={finished:<5} succeeded={succeeded:<5} avg={avg_duration:.1f}s")
@@ -0,0 +1,441 @@
+# cdp_driver.py
+import base64
+import collections
+import itertools
+import json
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import urllib.request
+
+import websocket # websocket-client
+from selenium.common.exceptions import (
+    ElementClickInterceptedException,
+    ElementNotInteractableException,
+    JavascriptException,
+    NoSuchElementException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
+from selenium.webdriver.common.by import By
+
+import config
+
+# ==============================================================================
+# Talks the Chrome DevTools Protocol directly over one persistent websocket.
+# No chromedriver process and no driver download: only a local Chrome binary.
+# CdpDriver/CdpElement mirror the subset of Selenium's WebDriver/WebElement API
+# used by the updaters, and raise Selenium's exception types, so existing
+# WebDriverWait/expected_conditions code keeps working unchanged.
+# ==============================================================================
+
+_CHROME_CANDIDATES = (
+    "google-chrome",
+    "google-chrome-stable",
+    "chromium",
+    "chromium-browser",
+    "chrome",
+    "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",
+    r"C:\Program Files\Google\Chrome\Application\chrome.exe",
+)
+
+# Errors meaning the page navigated away under a pending call; the call can be retried
+_CONTEXT_LOST_MESSAGES = ("Execution context was destroyed", "Cannot find context", "Inspected target navigated")
+
+# Resolves a Selenium (by, value) locator to the first matching element, or null
+_FIND_JS = """
+function(by, v) {
+    switch (by) {
+        case 'id': return document.getElementById(v);
+        case 'css selector': return document.querySelector(v);
+        case 'xpath': return document.evaluate(v, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        case 'name': return document.getElementsByName(v)[0] || null;
+        case 'class name': return document.getElementsByClassName(v)[0] || null;
+        case 'tag name': return document.getElementsByTagName(v)[0] || null;
+        case 'link text': return Array.from(document.links).find(a => a.innerText.trim() === v) || null;
+        case 'partial link text': return Array.from(document.links).find(a => a.innerText.includes(v)) || null;
+    }
+    throw new Error('Unsupported locator strategy: ' + by);
+}
+"""
+
+_VISIBLE_JS = """
+function(el) {
+    const style = getComputedStyle(el);
+    if (style.display === 'none' || style.visibility === 'hidden' || parseFloat(style.opacity) === 0) return false;
+    const rect = el.getBoundingClientRect();
+    return rect.width > 0 && rect.height > 0;
+}
+"""
+
+# Resolves once any of the [by, value] locators reaches the requested state. A MutationObserver
+# re-checks on every DOM change; the slow interval only covers pure CSS changes (transitions, stylesheets).
+_WAIT_JS = """
+(function(locators, state, timeoutMs) {
+    const find = %s;
+    const visible = %s;
+    const ready = (el) => el && (state === 'present' || (visible(el) && (state !== 'clickable' || !el.disabled)));
+    const findReady = () => {
+        for (const [by, v] of locators) { const el = find(by, v); if (ready(el)) return el; }
+        return null;
+    };
+    return new Promise((resolve) => {
+        const first = findReady();
+        if (first) { resolve(first); return; }
+        let observer, interval, timer;
+        const check = () => { const el = findReady(); if (el) done(el); };
+        const done = (el) => { observer.disconnect(); clearInterval(interval); clearTimeout(timer); resolve(el); };
+        observer = new MutationObserver(check);
+        observer.observe(document, {childList: true, subtree: true, attributes: true});
+        interval = setInterval(check, 250);
+        timer = setTimeout(() => done(null), timeoutMs);
+    });
+})
+""" % (_FIND_JS.strip(), _VISIBLE_JS.strip())
+
+
+class CdpError(WebDriverException):
+    """An error response returned by Chrome for a CDP command."""
+
+
+def find_chrome_binary() -> str:
+    """Returns the Chrome executable from config.CHROME_BINARY or the first one found on this machine."""
+    if config.CHROME_BINARY:
+        return config.CHROME_BINARY
+    for candidate in _CHROME_CANDIDATES:
+        path = shutil.which(candidate) or (candidate if os.path.isfile(candidate) else None)
+        if path:
+            return path
+    raise WebDriverException("Could not find a Chrome/Chromium binary. Set CHROME_BINARY to its path.")
+
+
+class CdpConnection:
+    """A synchronous CDP session over one websocket. Events are buffered until someone waits for them."""
+
+    def __init__(self, ws_url: str, timeout: float):
+        self._ws = websocket.create_connection(ws_url, timeout=timeout, suppress_origin=True)
+        self._ids = itertools.count(1)
+        self._events = collections.deque(maxlen=500)
+        self.default_timeout = timeout
+
+    def send(self, method: str, params: dict | None = None, timeout: float | None = None) -> dict:
+        """Sends a command and blocks until its response arrives."""
+        message_id = next(self._ids)
+        self._ws.send(json.dumps({"id": message_id, "method": method, "params": params or {}}))
+        deadline = time.monotonic() + (timeout or self.default_timeout)
+        while True:
+            message = self._recv(deadline, method)
+            if message.get("id") == message_id:
+                if "error" in message:
+                    raise CdpError(f"{method}: {message['error'].get('message')}")
+                return message.get("result", {})
+            if "method" in message:
+                self._events.append(message)
+
+    def drain_events(self, method: str):
+        """Drops buffered events of a type, e.g. a stale load event before a new navigation."""
+        self._events = collections.deque((e for e in self._events if e["method"] != method), maxlen=500)
+
+    def wait_event(self, method: str, timeout: float) -> dict:
+        """Returns the next event of a type, without polling."""
+        for event in self._events:
+            if event["method"] == method:
+                self._events.remove(event)
+                return event
+        deadline = time.monotonic() + timeout
+        while True:
+            message = self._recv(deadline, method)
+            if message.get("method") == method:
+                return message
+            if "method" in message:
+                self._events.append(message)
+
+    def _recv(self, deadline: float, waiting_for: str) -> dict:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutException(f"Timed out waiting for CDP {waiting_for}")
+        self._ws.settimeout(remaining)
+        try:
+            return json.loads(self._ws.recv())
+        except websocket.WebSocketTimeoutException as e:
+            raise TimeoutException(f"Timed out waiting for CDP {waiting_for}") from e
+
+    def close(self):
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+
+
+class CdpElement:
+    """A handle to a DOM node in the page, offering the WebElement methods the updaters use."""
+
+    def __init__(self, driver, object_id: str, locator=None):
+        self._driver = driver
+        self.object_id = object_id
+        self.locator = locator
+
+    def _call(self, function: str, *args):
+        """Runs a JS function with the element as `this` and returns its JSON result."""
+        wrapped = f"function(...a) {{ if (!this.isConnected) return {{__stale: true}}; return ({function}).apply(this, a); }}"
+        try:
+            result = self._driver._conn.send("Runtime.callFunctionOn", {
+                "objectId": self.object_id,
+                "functionDeclaration": wrapped,
+                "arguments": [{"value": arg} for arg in args],
+                "returnByValue": True,
+            })
+        except CdpError as e:
+            if "Could not find object" in str(e) or any(m in str(e) for m in _CONTEXT_LOST_MESSAGES):
+                raise StaleElementReferenceException(f"Element {self.locator} is no longer attached to the page") from e
+            raise
+        _raise_for_exception(result)
+        value = result["result"].get("value")
+        if isinstance(value, dict) and value.get("__stale"):
+            raise StaleElementReferenceException(f"Element {self.locator} is no longer attached to the page")
+        return value
+
+    @property
+    def text(self) -> str:
+        return self._call("function() { return (this.innerText || '').trim(); }")
+
+    @property
+    def tag_name(self) -> str:
+        return self._call("function() { return this.tagName.toLowerCase(); }")
+
+    def get_attribute(self, name: str) -> str | None:
+        """Like Selenium: the property if set to a primitive, else the attribute."""
+        return self._call("""function(n) {
+            const p = this[n];
+            if (p === true) return 'true';
+            if (p !== undefined && p !== null && p !== false && typeof p !== 'object' && typeof p !== 'function') return String(p);
+            return this.getAttribute(n);
+        }""", name)
+
+    def is_displayed(self) -> bool:
+        return self._call(f"function() {{ return ({_VISIBLE_JS.strip()})(this); }}")
+
+    def is_enabled(self) -> bool:
+        return self._call("function() { return !this.disabled; }")
+
+    def click(self):
+        """Clicks the element's centre with real mouse events, raising if another element covers it."""
+        point = self._call("""function() {
+            this.scrollIntoView({block: 'center', inline: 'center'});
+            const r = this.getBoundingClientRect();
+            const x = r.left + r.width / 2, y = r.top + r.height / 2;
+            const hit = document.elementFromPoint(x, y);
+            return {x: x, y: y, empty: r.width === 0 || r.height === 0, covered: !hit || (hit !== this && !this.contains(hit))};
+        }""")
+        if point["empty"]:
+            raise ElementNotInteractableException(f"Element {self.locator} has no size and cannot be clicked")
+        if point["covered"]:
+            raise ElementClickInterceptedException(f"Element {self.locator} is covered by another element")
+        for event_type in ("mousePressed", "mouseReleased"):
+            self._driver._conn.send("Input.dispatchMouseEvent", {
+                "type": event_type, "x": point["x"], "y": point["y"], "button": "left", "clickCount": 1,
+            })
+
+    def clear(self):
+        # The native setter keeps framework-controlled inputs (React etc.) in sync
+        self._call("""function() {
+            this.focus();
+            const proto = Object.getPrototypeOf(this);
+            const setter = Object.getOwnPropertyDescriptor(proto, 'value');
+            if (setter && setter.set) setter.set.call(this, ''); else this.value = '';
+            this.dispatchEvent(new Event('input', {bubbles: true}));
+            this.dispatchEvent(new Event('change', {bubbles: true}));
+        }""")
+
+    def send_keys(self, *value):
+        """Types plain text, or sets the file(s) when the element is an <input type="file">."""
+        text = "".join(str(v) for v in value)
+        if self._call("function() { return this.tagName === 'INPUT' && this.type === 'file'; }"):
+            self.set_files(text.split("\n"))
+            return
+        self._call("function() { this.focus(); }")
+        self._driver._conn.send("Input.insertText", {"text": text})
+
+    def set_files(self, paths):
+        self._driver._conn.send("DOM.setFileInputFiles", {
+            "files": [os.path.abspath(p) for p in paths], "objectId": self.object_id,
+        })
+
+
+def _raise_for_exception(result: dict):
+    details = result.get("exceptionDetails")
+    if details:
+        description = details.get("exception", {}).get("description") or details.get("text")
+        raise JavascriptException(description)
+
+
+class CdpDriver:
+    """Launches Chrome with remote debugging enabled and drives its first tab over CDP."""
+
+    def __init__(self, headless=True, arguments=(), startup_timeout=20, command_timeout=60):
+        self._implicit_wait = 0
+        self.page_load_timeout = command_timeout
+        self._process = None
+        self._user_data_dir = tempfile.mkdtemp(prefix="cdp_profile_")
+        try:
+            args = [find_chrome_binary(), f"--user-data-dir={self._user_data_dir}", "--remote-debugging-port=0",
+                    "--no-first-run", "--no-default-browser-check", *arguments]
+            if headless and not any(a.startswith("--headless") for a in args):
+                args.append("--headless=new")
+            args.append("about:blank")
+            logging.info("Launching Chrome for direct CDP control...")
+            self._process = subprocess.Popen(args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            port = self._wait_for_debugging_port(startup_timeout)
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/list", timeout=startup_timeout) as response:
+                targets = json.load(response)
+            page = next(t for t in targets if t.get("type") == "page")
+            self._conn = CdpConnection(page["webSocketDebuggerUrl"], command_timeout)
+            self._conn.send("Page.enable")
+        except Exception:
+            if self._process is not None:
+                self._process.kill()
+            self._shutdown_process()
+            raise
+
+    def _wait_for_debugging_port(self, timeout: float) -> int:
+        """Chrome writes the chosen port to DevToolsActivePort in the profile dir once it is listening."""
+        port_file = os.path.join(self._user_data_dir, "DevToolsActivePort")
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise WebDriverException(f"Chrome exited during startup (code {self._process.returncode}).")
+            try:
+                with open(port_file) as f:
+                    first_line = f.readline().strip()
+                if first_line:
+                    return int(first_line)
+            except (FileNotFoundError, ValueError):
+                pass
+            time.sleep(0.05)
+        raise WebDriverException("Timed out waiting for Chrome's remote debugging port.")
+
+    # --- WebDriver-compatible API ---
+    def implicitly_wait(self, seconds: float):
+        self._implicit_wait = seconds
+
+    def get(self, url: str):
+        """Navigates and waits for the load event (pushed by Chrome, not polled)."""
+        self._conn.drain_events("Page.loadEventFired")
+        result = self._conn.send("Page.navigate", {"url": url})
+        if result.get("errorText"):
+            raise WebDriverException(f"Navigation to {url} failed: {result['errorText']}")
+        self._conn.wait_event("Page.loadEventFired", self.page_load_timeout)
+
+    @property
+    def current_url(self) -> str:
+        return self._evaluate("location.href")["value"]
+
+    @property
+    def title(self) -> str:
+        return self._evaluate("document.title")["value"]
+
+    def find_element(self, by=By.ID, value=None) -> CdpElement:
+        if self._implicit_wait:
+            try:
+                return self.wait_for((by, value), "present", self._implicit_wait)
+            except TimeoutException as e:
+                raise NoSuchElementException(f"No element found for ({by}, {value})") from e
+        remote = self._evaluate(f"({_FIND_JS.strip()})({json.dumps(by)}, {json.dumps(value)})", by_value=False)
+        if remote.get("subtype") != "node":
+            raise NoSuchElementException(f"No element found for ({by}, {value})")
+        return CdpElement(self, remote["objectId"], (by, value))
+
+    def wait_for(self, locator, state="visible", timeout=config.EXPLICIT_WAIT_TIME) -> CdpElement:
+        """
+        Waits inside the page for a locator to become 'present', 'visible' or 'clickable'.
+
+        One CDP round trip per page: the browser resolves the promise as soon as a DOM
+        mutation makes the element ready. Retries only if a navigation replaces the page.
+        """
+        return self.wait_for_any([locator], state, timeout)
+
+    def wait_for_any(self, locators, state="visible", timeout=config.EXPLICIT_WAIT_TIME) -> CdpElement:
+        """Like wait_for, but returns the first element matching any of several locators."""
+        locators = list(locators)
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutException(f"Timed out after {timeout}s waiting for {locators} to be {state}")
+            expression = f"{_WAIT_JS.strip()}({json.dumps(locators)}, {json.dumps(state)}, {int(remaining * 1000)})"
+            try:
+                remote = self._evaluate(expression, await_promise=True, by_value=False, timeout=remaining + 5)
+            except CdpError as e:
+                if not any(m in str(e) for m in _CONTEXT_LOST_MESSAGES):
+                    raise
+                time.sleep(0.05) # Let the new document's context come up
+                continue
+            if remote.get("subtype") == "node":
+                return CdpElement(self, remote["objectId"], locators[0] if len(locators) == 1 else None)
+            raise TimeoutException(f"Timed out after {timeout}s waiting for {locators} to be {state}")
+
+    def execute_script(self, script: str, *args):
+        """Runs a script body with Selenium's `arguments` convention; elements may be passed and returned."""
+        function = f"function() {{ {script} }}"
+        element = next((a for a in args if isinstance(a, CdpElement)), None)
+        if element is not None:
+            params = {
+                "objectId": element.object_id,
+                "functionDeclaration": function,
+                "arguments": [{"objectId": a.object_id} if isinstance(a, CdpElement) else {"value": a} for a in args],
+            }
+            result = self._conn.send("Runtime.callFunctionOn", params)
+            _raise_for_exception(result)
+            remote = result["result"]
+        else:
+            remote = self._evaluate(f"({function}).apply(null, {json.dumps(list(args))})", by_value=False)
+        return self._unwrap(remote)
+
+    def _unwrap(self, remote: dict):
+        if remote.get("subtype") == "node":
+            return CdpElement(self, remote["objectId"])
+        if "value" in remote or "objectId" not in remote:
+            return remote.get("value")
+        result = self._conn.send("Runtime.callFunctionOn", {
+            "objectId": remote["objectId"], "functionDeclaration": "function() { return this; }", "returnByValue": True,
+        })
+        return result["result"].get("value")
+
+    def save_screenshot(self, filename: str) -> bool:
+        try:
+            data = self._conn.send("Page.captureScreenshot", {"format": "png"})["data"]
+            with open(filename, "wb") as f:
+                f.write(base64.b64decode(data))
+            return True
+        except Exception as e:
+            logging.warning(f"CDP screenshot failed: {e}")
+            return False
+
+    def quit(self):
+        try:
+            self._conn.send("Browser.close", timeout=5)
+        except Exception:
+            pass
+        self._conn.close()
+        self._shutdown_process()
+
+    # --- Internals ---
+    def _evaluate(self, expression: str, await_promise=False, by_value=True, timeout=None) -> dict:
+        result = self._conn.send("Runtime.evaluate", {
+            "expression": expression, "awaitPromise": await_promise, "returnByValue": by_value,
+        }, timeout=timeout)
+        _raise_for_exception(result)
+        return result["result"]
+
+    def _shutdown_process(self):
+        if self._process is not None:
+            try:
+                self._process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        shutil.rmtree(self._user_data_dir, ignore_errors=True)
@@ -1,5 +1,6 @@
 # config.py
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,6 +11,8 @@ NAUKRI_PASSWORD = os.getenv("NAUKRI_PASSWORD")
 
 # --- Paths ---
 RESUME_FOLDER = os.path.join(os.path.dirname(__file__), "resumes")
+# Optional CSV (site,username,password,password_env) for running many accounts; see README
+ACCOUNTS_FILE = os.getenv("ACCOUNTS_FILE")
 
 # --- URLs ---
 NAUKRI_LOGIN_URL = "https://login.naukri.com/"
@@ -24,9 +27,57 @@ HEADLESS_BROWSER = True # Set to False for local debugging, True for deployment
 IMPLICIT_WAIT_TIME = 10
 EXPLICIT_WAIT_TIME = 35 # Increased wait time
 
+# --- Browser Engine ---
+# "selenium": Selenium + chromedriver (downloaded by webdriver-manager).
+# "cdp": drives Chrome directly over the DevTools Protocol, no chromedriver needed.
+BROWSER_ENGINE = os.getenv("BROWSER_ENGINE", "selenium").lower()
+NAUKRI_BROWSER_ENGINE = os.getenv("NAUKRI_BROWSER_ENGINE", BROWSER_ENGINE).lower() # Per-site override
+CHROME_BINARY = os.getenv("CHROME_BINARY") # Optional; the cdp engine searches common install paths otherwise
+
+# --- Run History ---
+# Every run_update() appends phase timings, retries and outcome to this SQLite file.
+# Report with: python run_history.py report --days 30
+RUN_HISTORY_ENABLED = os.getenv("RUN_HISTORY_ENABLED", "true").lower() != "false"
+RUN_HISTORY_DB = os.getenv("RUN_HISTORY_DB", os.path.join(os.path.dirname(__file__), "run_history.db"))
+RUN_HISTORY_BUSY_TIMEOUT = 10 # Seconds a writer waits for the database lock
+REGRESSION_RECENT_DAYS = 3 # Window compared against the baseline
+REGRESSION_BASELINE_DAYS = 27 # Baseline window preceding the recent one
+REGRESSION_THRESHOLD = 1.5 # Flag a phase when its recent median is this many times the baseline
+REGRESSION_MIN_SAMPLES = 5 # Minimum runs in each window before a phase is compared
+
+# --- Distributed Account Queue ---
+# Shared SQLite file that workers lease accounts from (python main.py --queue PATH)
+QUEUE_DB = os.getenv("QUEUE_DB", os.path.join(os.path.dirname(__file__), "account_queue.db"))
+QUEUE_LEASE_SECONDS = 300 # A lease not renewed within this time is handed to another worker
+QUEUE_MAX_ATTEMPTS = 3 # Attempts per account and batch before it is marked failed
+QUEUE_BUSY_TIMEOUT = 30 # Seconds a worker waits for the queue lock
+
+# --- Request Pacing ---
+# Token buckets shared by all workers on this machine; see rate_limiter.py
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() != "false"
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB", os.path.join(tempfile.gettempdir(), "job_profile_updater_pacing.db")) # Must be node-local
+RATE_LIMIT_BUSY_TIMEOUT = 10
+# action -> (requests per second, burst size). Use "Site:action" keys (e.g. "Naukri:login") for per-site values.
+RATE_LIMITS = {
+    "login": (0.2, 2),
+    "page_load": (1.0, 5),
+    "save": (0.5, 3),
+    "upload": (0.1, 2),
+}
+RATE_LIMIT_DEFAULT = (1.0, 5)
+RATE_LIMIT_BACKOFF = 0.5 # Multiply a site's rates by this on each throttling signal
+RATE_LIMIT_RECOVERY = 0.1 # Add this back to the rate scale (max 1.0) after each successful run
+RATE_LIMIT_MIN_SCALE = 0.05
+RATE_LIMIT_THROTTLE_DEBOUNCE = 60 # Seconds; throttling reports within this window of the last one count once
+# Page text that means the site is throttling us (checked in lower case)
+THROTTLE_MARKERS = ("too many requests", "captcha", "unusual traffic", "access denied", "try again later")
+
 # --- Validation ---
 def validate_config():
-    if not NAUKRI_USERNAME or not NAUKRI_PASSWORD:
+    if ACCOUNTS_FILE:
+        if not os.path.isfile(ACCOUNTS_FILE):
+            raise FileNotFoundError(f"Accounts file not found at: {ACCOUNTS_FILE}")
+    elif not NAUKRI_USERNAME or not NAUKRI_PASSWORD:
         raise ValueError("NAUKRI_USERNAME and NAUKRI_PASSWORD environment variables must be set.")
     if not os.path.isdir(RESUME_FOLDER):
          raise FileNotFoundError(f"Resume folder not found at: {RESUME_FOLDER}")
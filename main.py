@@ -1,8 +1,14 @@
+import argparse
 import logging
 import sys
 import os # Added for potential path debugging
+import time
 
 import config
+import run_history
+import rate_limiter
+import account_queue
+from account_queue import Account, AccountQueue, LeaseKeeper
 from naukri_updater import NaukriUpdater
 # Import other updaters here when you add them
 # from linkedin_updater import LinkedInUpdater
@@ -10,57 +16,142 @@ from naukri_updater import NaukriUpdater
 # Configure logging (ensure it's set up before first log message)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-def main():
+UPDATER_CLASSES = {
+    "Naukri": NaukriUpdater,
+    # "LinkedIn": LinkedInUpdater, # Example for expansion
+}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Update job site profiles.")
+    parser.add_argument("--accounts", default=config.ACCOUNTS_FILE,
+                        help="CSV of accounts (site,username,password,password_env). Defaults to the credentials in config.")
+    parser.add_argument("--shard", type=account_queue.parse_shard, default=None,
+                        help="Only process shard i of N (e.g. 0/4), deterministic across machines.")
+    parser.add_argument("--queue", nargs="?", const=config.QUEUE_DB, default=None,
+                        help="Lease accounts from a shared queue database instead of processing the list directly.")
+    parser.add_argument("--batch", default=account_queue.default_batch(),
+                        help="Queue batch id; each account is completed once per batch (defaults to today's UTC date).")
+    parser.add_argument("--worker-id", default=account_queue.default_worker_id(), help="Name of this worker in the queue.")
+    parser.add_argument("--summary", action="store_true", help="Print the queue summary for the batch and exit.")
+    return parser.parse_args(argv)
+
+def configured_accounts(accounts_file=None):
+    """Accounts from the CSV file, or one account per site from the *_USERNAME/*_PASSWORD settings."""
+    if accounts_file:
+        return account_queue.load_accounts(accounts_file)
+    accounts = []
+    for site_name in UPDATER_CLASSES:
+        # Dynamically get credentials from config based on site name (requires convention)
+        username = getattr(config, f"{site_name.upper()}_USERNAME", None)
+        password = getattr(config, f"{site_name.upper()}_PASSWORD", None)
+        if not username or not password:
+            logging.warning(f"Credentials for {site_name} not found in config, skipping.")
+            continue
+        accounts.append(Account(site_name, username, password))
+    return accounts
+
+def process_account(account):
+    """Runs one update for one account. Returns True on success."""
+    site_name = account.site
+    logging.info("="*20 + f" Processing {site_name} ({account.username}) " + "="*20)
+    UpdaterClass = UPDATER_CLASSES.get(site_name)
+    if UpdaterClass is None:
+        logging.error(f"No updater registered for site '{site_name}', skipping {account.username}.")
+        return False
+    if not account.password:
+        logging.warning(f"Password for {site_name} account {account.username} not found, skipping.")
+        return False
+
+    updater_instance = None # Define outside try block for potential cleanup
+    try:
+        updater_instance = UpdaterClass(
+            username=account.username,
+            password=account.password,
+            headless=config.HEADLESS_BROWSER
+        )
+
+        success = updater_instance.run_update()
+
+        if success:
+            logging.info(f"{site_name} update attempt finished successfully.")
+        else:
+            logging.error(f"{site_name} update attempt finished with errors.")
+        return success
+
+    except Exception as e:
+        logging.error(f"A critical error occurred while processing {site_name}: {e}", exc_info=True)
+        # Ensure driver is quit even if run_update fails before the finally block
+        if updater_instance and updater_instance.driver:
+             logging.info(f"Attempting to quit driver for {site_name} after critical error.")
+             updater_instance.driver.quit()
+        return False
+
+def run_queue_worker(accounts, queue, worker_id, shard=None):
+    """Leases accounts from the shared queue until none are left for this worker. Returns True if all succeeded."""
+    by_key = {account.key: account for account in accounts}
+    added = queue.enqueue(accounts) # Idempotent: every worker can seed the batch
+    logging.info(f"Worker {worker_id} joined batch {queue.batch} ({added} new accounts queued).")
+
+    overall_success = True
+    while True:
+        leased = queue.lease(worker_id, shard, known=by_key) # Only accounts this worker has credentials for
+        if leased is None:
+            # Other workers still hold leases; if one of them dies its lease expires and we take over
+            expiry = queue.next_lease_expiry(shard, known=by_key)
+            if expiry is None:
+                break
+            wait = min(max(expiry - time.time(), 0) + 1, queue.lease_seconds)
+            logging.info(f"Worker {worker_id}: waiting {wait:.0f}s for accounts leased by other workers.")
+            time.sleep(wait)
+            continue
+        site_name, username = leased
+        account = by_key[f"{site_name}:{username}"]
+        start = time.monotonic()
+        with LeaseKeeper(queue, worker_id, site_name, username):
+            success = process_account(account)
+        if not queue.complete(worker_id, site_name, username, success, time.monotonic() - start):
+            logging.warning(f"Lease on {site_name}:{username} expired before completion; result not recorded.")
+        overall_success = overall_success and success
+
+    logging.info(f"Worker {worker_id}: no more accounts to lease in batch {queue.batch}.")
+    return overall_success
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    if args.summary:
+        queue_path = args.queue or config.QUEUE_DB
+        if not os.path.exists(queue_path):
+            logging.error(f"No queue found at {queue_path}")
+            sys.exit(1)
+        account_queue.print_summary(AccountQueue(queue_path, args.batch, create=False).summary())
+        return
+
     logging.info("Starting job profile update process...")
     logging.info(f"Current working directory: {os.getcwd()}") # Log CWD for path context
 
+    config.ACCOUNTS_FILE = args.accounts
     try:
         config.validate_config()
+        accounts = configured_accounts(args.accounts)
     except (ValueError, FileNotFoundError) as e:
         logging.error(f"Configuration error: {e}")
         sys.exit(1) # Exit if essential config is missing
 
-    updater_classes = {
-        "Naukri": NaukriUpdater,
-        # "LinkedIn": LinkedInUpdater, # Example for expansion
-    }
-
-    overall_success = True
+    if args.queue:
+        queue = AccountQueue(args.queue, args.batch)
+        overall_success = run_queue_worker(accounts, queue, args.worker_id, args.shard)
+        account_queue.print_summary(queue.summary())
+    else:
+        overall_success = True
+        for account in accounts:
+            if not account_queue.in_shard(account, args.shard):
+                continue
+            if not process_account(account):
+                overall_success = False # Mark overall process as failed if any account fails
 
-    for site_name, UpdaterClass in updater_classes.items():
-        logging.info("="*20 + f" Processing {site_name} " + "="*20)
-        updater_instance = None # Define outside try block for potential cleanup
-
-        try:
-            # Dynamically get credentials from config based on site name (requires convention)
-            username = getattr(config, f"{site_name.upper()}_USERNAME", None)
-            password = getattr(config, f"{site_name.upper()}_PASSWORD", None)
-
-            if not username or not password:
-                logging.warning(f"Credentials for {site_name} not found in config, skipping.")
-                continue # Skip to the next site
-
-            updater_instance = UpdaterClass(
-                username=username,
-                password=password,
-                headless=config.HEADLESS_BROWSER
-            )
-
-            success = updater_instance.run_update()
-
-            if success:
-                logging.info(f"{site_name} update attempt finished successfully.")
-            else:
-                logging.error(f"{site_name} update attempt finished with errors.")
-                overall_success = False # Mark overall process as failed if any site fails
-
-        except Exception as e:
-            logging.error(f"A critical error occurred while processing {site_name}: {e}", exc_info=True)
-            overall_success = False
-            # Ensure driver is quit even if run_update fails before the finally block
-            if updater_instance and updater_instance.driver:
-                 logging.info(f"Attempting to quit driver for {site_name} after critical error.")
-                 updater_instance.driver.quit()
+    run_history.log_regressions() # Warn early if a phase has slowed down compared to its baseline
+    rate_limiter.log_stats() # Time spent queued by the shared request pacing on this machine
 
     logging.info("="*50)
     if overall_success:
@@ -70,4 +161,4 @@ def main():
          # sys.exit(1) # Optionally exit with error code if any part failed
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
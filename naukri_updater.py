@@ -3,8 +3,6 @@ import logging
 import time
 import os
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from datetime import datetime
 
 from web_updater import WebUpdater
@@ -14,15 +12,19 @@ import config # Import config to access the new flag
 class NaukriUpdater(WebUpdater):
     """Specific implementation for updating Naukri profile."""
 
-    def __init__(self, username, password, headless=True):
-        super().__init__(username, password, headless)
+    site_name = "Naukri"
+
+    def __init__(self, username, password, headless=True, engine=None):
+        super().__init__(username, password, headless, engine or config.NAUKRI_BROWSER_ENGINE)
         self.locators = NaukriLocators
 
     # --- login method remains the same ---
     def login(self):
         # (Keep the robust login logic from the previous answer)
         logging.info("Attempting to log into Naukri...")
+        credentials_submitted = False
         try:
+            self.pace("login") # Before the form is filled, so a backoff never leaves credentials waiting
             self.driver.get(config.NAUKRI_LOGIN_URL)
             time.sleep(2) # Allow page initial load
 
@@ -30,9 +32,7 @@ class NaukriUpdater(WebUpdater):
             try:
                 if hasattr(self.locators, 'COOKIE_BANNER_ACCEPT_BUTTON'):
                     logging.info("Checking for and clicking potential cookie banner...")
-                    banner_button = WebDriverWait(self.driver, 7).until(
-                        EC.element_to_be_clickable(self.locators.COOKIE_BANNER_ACCEPT_BUTTON) # Verify locator
-                    )
+                    banner_button = self.wait_for(self.locators.COOKIE_BANNER_ACCEPT_BUTTON, "clickable", 7) # Verify locator
                     banner_button.click()
                     logging.info("Clicked cookie banner accept button.")
                     time.sleep(1)
@@ -52,28 +52,35 @@ class NaukriUpdater(WebUpdater):
 
             logging.info("Attempting to click login button...")
             self.safe_click(self.locators.LOGIN_BUTTON) # Verify locator
+            credentials_submitted = True
             logging.info("Submitted login credentials.")
 
-            WebDriverWait(self.driver, config.EXPLICIT_WAIT_TIME).until(
-                 EC.any_of(
-                     EC.presence_of_element_located(self.locators.VIEW_PROFILE_LINK), # Verify locator
-                     EC.presence_of_element_located(self.locators.PROFILE_MENU_ICON)  # Verify locator
-                 )
+            self.wait_for_any(
+                [
+                    self.locators.VIEW_PROFILE_LINK, # Verify locator
+                    self.locators.PROFILE_MENU_ICON, # Verify locator
+                ],
+                "present",
+                config.EXPLICIT_WAIT_TIME,
+                record=True,
             )
             logging.info("Naukri login successful.")
             time.sleep(2)
 
         except TimeoutException as e:
             context = "login_timeout_failure"
-            if hasattr(self.locators, 'USERNAME_INPUT') and self.locators.USERNAME_INPUT[1] in str(e):
+            if credentials_submitted:
+                 # Only this case counts as a rejected login; a form timeout is a locator problem
+                 logging.error("Login submitted, but timed out waiting for dashboard confirmation.")
+                 context = "login_confirmation_timeout"
+            elif hasattr(self.locators, 'USERNAME_INPUT') and self.locators.USERNAME_INPUT[1] in str(e):
                  logging.error(f"Login failed: Timeout finding/interacting with USERNAME ({self.locators.USERNAME_INPUT}). Verify locator.", exc_info=False)
             elif hasattr(self.locators, 'PASSWORD_INPUT') and self.locators.PASSWORD_INPUT[1] in str(e):
                  logging.error(f"Login failed: Timeout finding/interacting with PASSWORD ({self.locators.PASSWORD_INPUT}). Verify locator.", exc_info=False)
             elif hasattr(self.locators, 'LOGIN_BUTTON') and self.locators.LOGIN_BUTTON[1] in str(e):
                  logging.error(f"Login failed: Timeout finding/interacting with LOGIN BUTTON ({self.locators.LOGIN_BUTTON}). Verify locator.", exc_info=False)
             else:
-                 logging.error("Login submitted, but timed out waiting for dashboard confirmation.")
-                 context = "login_confirmation_timeout"
+                 logging.error("Login failed: Timeout on the login form before the credentials were submitted. Verify locators.")
             self._log_debug_info(context)
             raise RuntimeError("Login process failed due to timeout.") from e
         except Exception as e:
@@ -90,12 +97,11 @@ class NaukriUpdater(WebUpdater):
         try:
             # Try direct navigation
             try:
-                profile_link = WebDriverWait(self.driver, 5).until(
-                    EC.presence_of_element_located(self.locators.VIEW_PROFILE_LINK) # Verify locator
-                )
+                profile_link = self.wait_for(self.locators.VIEW_PROFILE_LINK, "present", 5, record=True) # Verify locator
                 profile_url = profile_link.get_attribute('href')
                 if profile_url and 'mnjuser/profile' in profile_url:
                      logging.info(f"Attempting direct navigation using href: {profile_url}")
+                     self.pace("page_load")
                      self.driver.get(profile_url)
                      nav_action_done = True
                      logging.info("Direct navigation attempt complete.")
@@ -115,8 +121,7 @@ class NaukriUpdater(WebUpdater):
             logging.info("Confirming profile page primary element is loaded...")
             primary_element_locator = self.locators.EDIT_RESUME_HEADLINE_ICON # Assumes this locator is correct now
             try:
-                wait = WebDriverWait(self.driver, config.EXPLICIT_WAIT_TIME + 5)
-                wait.until(EC.visibility_of_element_located(primary_element_locator))
+                self.wait_for(primary_element_locator, "visible", config.EXPLICIT_WAIT_TIME + 5, record=True)
                 logging.info(f"Primary profile page element confirmed ({primary_element_locator}).")
             except TimeoutException as confirm_e:
                 logging.error(f"Failed to confirm presence/visibility of the primary profile element ({primary_element_locator}).")
@@ -141,9 +146,7 @@ class NaukriUpdater(WebUpdater):
              return
         logging.info("Checking for profile help pop-up...")
         try:
-            close_button = WebDriverWait(self.driver, 7).until(
-                 EC.element_to_be_clickable(self.locators.POPUP_CLOSE_BUTTON) # Verify locator
-             )
+            close_button = self.wait_for(self.locators.POPUP_CLOSE_BUTTON, "clickable", 7) # Verify locator
             logging.info("Profile help pop-up detected. Attempting to close.")
             self.driver.execute_script("arguments[0].click();", close_button)
             logging.info("Clicked pop-up close button via JS.")
@@ -184,9 +187,7 @@ class NaukriUpdater(WebUpdater):
                  summary_icon_element = self.safe_find_element(summary_edit_icon_locator, timeout=config.EXPLICIT_WAIT_TIME)
                  self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", summary_icon_element)
                  time.sleep(1)
-                 WebDriverWait(self.driver, config.EXPLICIT_WAIT_TIME).until(
-                     EC.element_to_be_clickable(summary_edit_icon_locator)
-                 )
+                 self.wait_for(summary_edit_icon_locator, "clickable", config.EXPLICIT_WAIT_TIME)
                  self.edit_text_field_with_toggle(
                      summary_edit_icon_locator,
                      self.locators.PROFILE_SUMMARY_TEXTAREA,    # Verify locator (in edit mode)!
@@ -214,18 +215,19 @@ class NaukriUpdater(WebUpdater):
             # If it fails here, the locator is wrong OR the input is truly hidden AND not interactable.
             try:
                 # Try finding with visibility check first
-                file_input = self.safe_find_element(file_input_locator, timeout=config.EXPLICIT_WAIT_TIME)
+                file_input = self.safe_find_element(file_input_locator, timeout=config.EXPLICIT_WAIT_TIME, record=False)
             except TimeoutException:
                  # If visibility fails, try finding just by presence for hidden inputs
                  logging.warning(f"Could not find visible file input {file_input_locator}. Trying presence check...")
                  try:
-                      file_input = WebDriverWait(self.driver, 5).until(
-                          EC.presence_of_element_located(file_input_locator)
-                      )
+                      file_input = self.wait_for(file_input_locator, "present", 5)
                       logging.info(f"Found file input by presence: {file_input_locator}")
                  except TimeoutException as presence_e:
                      logging.error(f"Failed to find file input element {file_input_locator} even by presence.")
+                     self._note_locator(file_input_locator, ok=False)
                      raise presence_e # Re-raise the specific error
+            # Recorded once: hidden inputs are normally found by the presence fallback, which is not a failure
+            self._note_locator(file_input_locator)
 
             # Scroll into view (use fallback if needed)
             try:
@@ -243,6 +245,7 @@ class NaukriUpdater(WebUpdater):
 
             # --- Send file path directly to the input element ---
             logging.info(f"Sending file path '{resume_path}' to the file input element.")
+            self.pace("upload")
             file_input.send_keys(resume_path)
             logging.info("File path sent to input element.")
 
@@ -250,11 +253,9 @@ class NaukriUpdater(WebUpdater):
             # --- CRITICAL: Verify this locator for the success message/state ---
             success_locator = self.locators.RESUME_UPLOAD_SUCCESS_INDICATOR
             logging.debug(f"Waiting for resume upload success indicator: {success_locator}")
-            wait = WebDriverWait(self.driver, 90) # Long timeout for upload process
-            wait.until(
-                EC.visibility_of_element_located(success_locator) # Wait for visibility of the confirmation
-            )
+            self.wait_for(success_locator, "visible", 90, record=True) # Long timeout for upload process
             logging.info("Naukri resume update confirmed by success indicator.")
+            self.run_record.bytes_uploaded += os.path.getsize(resume_path)
             time.sleep(3)
 
         except (TimeoutException, NoSuchElementException) as e:
@@ -271,6 +272,8 @@ class NaukriUpdater(WebUpdater):
     # --- _log_debug_info method remains the same ---
     def _log_debug_info(self, error_context="general_error"):
         # (Keep the _log_debug_info logic from the previous answer)
+        if self.run_record.error_context is None: # The first failing step is the one worth reporting
+            self.run_record.error_context = error_context
         if not self.driver:
             logging.error("Driver not available, cannot log debug info.")
             return
@@ -0,0 +1,238 @@
+# rate_limiter.py
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+import config
+import utils
+
+# ==============================================================================
+# Token buckets keyed by (site, action), shared by every thread and process on
+# this machine through one small SQLite file. acquire() reserves a token in one
+# short transaction and sleeps outside it, so waiters queue up fairly instead of
+# retrying. Throttling signals shrink a site's rates (multiplicative decrease);
+# successful runs restore them slowly (additive increase).
+# ==============================================================================
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    site TEXT NOT NULL,
+    action TEXT NOT NULL,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    scale REAL NOT NULL DEFAULT 1.0,
+    acquisitions INTEGER NOT NULL DEFAULT 0,
+    queued INTEGER NOT NULL DEFAULT 0,
+    total_wait REAL NOT NULL DEFAULT 0,
+    max_wait REAL NOT NULL DEFAULT 0,
+    throttles INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (site, action)
+);
+
+CREATE TABLE IF NOT EXISTS throttle_events (
+    site TEXT PRIMARY KEY,
+    last_at REAL NOT NULL
+);
+"""
+
+_initialized_paths = set()
+_init_lock = threading.Lock()
+
+# Waits by this process only, for the end-of-run report: (site, action) -> [requests, queued, total_wait]
+_process_waits = {}
+_process_lock = threading.Lock()
+
+
+def limits_for(site: str, action: str) -> tuple[float, float]:
+    """(tokens per second, burst size) for a site/action; 'Site:action' keys override plain 'action' keys."""
+    return config.RATE_LIMITS.get(f"{site}:{action}") or config.RATE_LIMITS.get(action) or config.RATE_LIMIT_DEFAULT
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(db_path, timeout=config.RATE_LIMIT_BUSY_TIMEOUT, isolation_level=None)
+    with _init_lock:
+        if db_path not in _initialized_paths:
+            utils.init_sqlite_schema(conn, SCHEMA) # Node-local file, so WAL is safe
+            _initialized_paths.add(db_path)
+    return conn
+
+
+def _site_scale(conn: sqlite3.Connection, site: str) -> float:
+    """New buckets start at the site's current (possibly backed-off) scale."""
+    row = conn.execute("SELECT MIN(scale) FROM buckets WHERE site = ?", (site,)).fetchone()
+    return row[0] if row and row[0] is not None else 1.0
+
+
+def acquire(site: str, action: str, db_path: str | None = None) -> float:
+    """
+    Blocks until this process may perform `action` on `site`.
+
+    Never raises: if the limiter store is unavailable the action proceeds unpaced.
+
+    Returns:
+        Seconds spent waiting in the queue.
+    """
+    if not config.RATE_LIMIT_ENABLED:
+        return 0.0
+    db_path = db_path or config.RATE_LIMIT_DB
+    rate, burst = limits_for(site, action)
+    try:
+        conn = _connect(db_path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute(
+                "SELECT tokens, updated_at, scale FROM buckets WHERE site = ? AND action = ?", (site, action)
+            ).fetchone()
+            if row is None:
+                tokens, updated_at, scale = burst, now, _site_scale(conn, site)
+            else:
+                tokens, updated_at, scale = row
+            effective_rate = rate * scale
+            tokens = min(max(burst * scale, 1.0), tokens + max(now - updated_at, 0) * effective_rate) - 1
+            # A negative balance is a reservation: wait until it has been refilled
+            wait = -tokens / effective_rate if tokens < 0 else 0.0
+            conn.execute(
+                "INSERT INTO buckets (site, action, tokens, updated_at, scale, acquisitions, queued, total_wait, max_wait)"
+                " VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?)"
+                " ON CONFLICT (site, action) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at,"
+                " acquisitions = acquisitions + 1, queued = queued + excluded.queued,"
+                " total_wait = total_wait + excluded.total_wait, max_wait = MAX(max_wait, excluded.max_wait)",
+                (site, action, tokens, now, scale, int(wait > 0), wait, wait),
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logging.warning(f"Rate limiter unavailable ({db_path}), proceeding without pacing: {e}")
+        return 0.0
+
+    with _process_lock:
+        counts = _process_waits.setdefault((site, action), [0, 0, 0.0])
+        counts[0] += 1
+        counts[1] += int(wait > 0)
+        counts[2] += wait
+    if wait > 0:
+        logging.info(f"Pacing {site}/{action}: waiting {wait:.1f}s (rate scale {scale:.2f}).")
+        time.sleep(wait)
+    return wait
+
+
+def _execute(sql: str, params: tuple, db_path: str | None = None):
+    if not config.RATE_LIMIT_ENABLED:
+        return
+    db_path = db_path or config.RATE_LIMIT_DB
+    try:
+        conn = _connect(db_path)
+        try:
+            conn.execute(sql, params)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logging.warning(f"Could not update rate limiter state in {db_path}: {e}")
+
+
+def report_throttled(site: str, reason: str, db_path: str | None = None) -> bool:
+    """
+    Slows every action on a site after a throttling page, CAPTCHA or rejected login.
+
+    Reports within RATE_LIMIT_THROTTLE_DEBOUNCE seconds of the previous one are ignored,
+    so many workers hitting the same block at once back off only once.
+
+    Returns:
+        True if the rates were reduced.
+    """
+    if not config.RATE_LIMIT_ENABLED:
+        return False
+    db_path = db_path or config.RATE_LIMIT_DB
+    try:
+        conn = _connect(db_path)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute("SELECT last_at FROM throttle_events WHERE site = ?", (site,)).fetchone()
+            if row and now - row[0] < config.RATE_LIMIT_THROTTLE_DEBOUNCE:
+                conn.execute("COMMIT")
+                logging.info(f"Throttling signal from {site} ({reason}) already applied {now - row[0]:.0f}s ago.")
+                return False
+            conn.execute(
+                "INSERT INTO throttle_events (site, last_at) VALUES (?, ?)"
+                " ON CONFLICT (site) DO UPDATE SET last_at = excluded.last_at",
+                (site, now),
+            )
+            # Dropping the balance to zero also stops queued bursts from firing at the old rate
+            conn.execute(
+                "UPDATE buckets SET scale = MAX(?, scale * ?), tokens = MIN(tokens, 0), throttles = throttles + 1 WHERE site = ?",
+                (config.RATE_LIMIT_MIN_SCALE, config.RATE_LIMIT_BACKOFF, site),
+            )
+            conn.execute("COMMIT")
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logging.warning(f"Could not update rate limiter state in {db_path}: {e}")
+        return False
+    logging.warning(f"Throttling signal from {site} ({reason}); reducing request rates.")
+    return True
+
+
+def report_ok(site: str, db_path: str | None = None):
+    """Recovers a site's rates gradually after a successful run."""
+    _execute("UPDATE buckets SET scale = MIN(1.0, scale + ?) WHERE site = ?", (config.RATE_LIMIT_RECOVERY, site), db_path)
+
+
+def stats(db_path: str | None = None) -> list[tuple]:
+    """Returns (site, action, acquisitions, queued, total_wait, max_wait, scale, throttles) per bucket."""
+    db_path = db_path or config.RATE_LIMIT_DB
+    if not os.path.exists(db_path):
+        return []
+    conn = _connect(db_path)
+    try:
+        return conn.execute(
+            "SELECT site, action, acquisitions, queued, total_wait, max_wait, scale, throttles"
+            " FROM buckets ORDER BY site, action"
+        ).fetchall()
+    finally:
+        conn.close()
+
+
+def log_stats():
+    """Logs the time this process spent queued per site/action. Node-wide totals: `python rate_limiter.py stats`."""
+    with _process_lock:
+        snapshot = sorted(_process_waits.items())
+    for (site, action), (requests, queued, total_wait) in snapshot:
+        logging.info(f"Pacing {site}/{action}: {requests} requests, {queued} queued, {total_wait:.1f}s total wait")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or reset the shared request pacing state on this machine.")
+    parser.add_argument("command", choices=("stats", "reset"), nargs="?", default="stats")
+    parser.add_argument("--db", default=config.RATE_LIMIT_DB, help="Path to the rate limiter database.")
+    args = parser.parse_args(argv)
+
+    if args.command == "reset":
+        if os.path.exists(args.db):
+            conn = _connect(args.db)
+            try:
+                conn.execute("DELETE FROM buckets")
+                conn.execute("DELETE FROM throttle_events")
+            finally:
+                conn.close()
+        print(f"Reset pacing state in {args.db}")
+        return 0
+
+    rows = stats(args.db)
+    if not rows:
+        print(f"No pacing state found at {args.db}")
+        return 0
+    print(f"  {'site':<12} {'action':<12} {'requests':>9} {'queued':>7} {'wait(s)':>9} {'max(s)':>7} {'scale':>6} {'throttles':>9}")
+    for site, action, acquisitions, queued, total_wait, max_wait, scale, throttles in rows:
+        print(f"  {site:<12} {action:<12} {acquisitions:>9} {queued:>7} {total_wait:>9.1f} {max_wait:>7.1f} {scale:>6.2f} {throttles:>9}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
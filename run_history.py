@@ -0,0 +1,322 @@
+# run_history.py
+import argparse
+import logging
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+import utils
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    site TEXT NOT NULL,
+    account TEXT NOT NULL,
+    outcome TEXT NOT NULL,
+    duration REAL NOT NULL,
+    retries INTEGER NOT NULL DEFAULT 0,
+    bytes_uploaded INTEGER NOT NULL DEFAULT 0,
+    error_context TEXT,
+    error_message TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs (started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_site_account ON runs (site, account, started_at);
+
+CREATE TABLE IF NOT EXISTS phases (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    started_at REAL NOT NULL,
+    site TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    duration REAL NOT NULL,
+    ok INTEGER NOT NULL
+);
+-- Reports filter on a time window; covering indexes answer them without touching the table
+CREATE INDEX IF NOT EXISTS idx_phases_started ON phases (started_at, site, phase, duration, ok);
+
+CREATE TABLE IF NOT EXISTS locators (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    started_at REAL NOT NULL,
+    site TEXT NOT NULL,
+    locator TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    failures INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_locators_started ON locators (started_at, site, locator, attempts, failures);
+"""
+
+_initialized_paths = set()
+_init_lock = threading.Lock()
+
+
+class RunRecord:
+    """Collects timings and counters for a single run_update() call."""
+
+    def __init__(self, site: str, account: str):
+        self.site = site
+        self.account = account or ""
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.duration = 0.0
+        self.outcome = "unknown"
+        self.retries = 0
+        self.bytes_uploaded = 0
+        self.error_context = None
+        self.error_message = None
+        self.phases = []     # (phase, duration, ok)
+        self.locators = {}   # name -> [attempts, failures]
+        self.queued = {}     # pacing action -> seconds spent waiting for the rate limiter
+        self._queued_total = 0.0
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times a block of work and stores it as a named phase, excluding rate limiter waits inside it."""
+        start = time.perf_counter()
+        queued_before = self._queued_total
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            queued = self._queued_total - queued_before
+            self.phases.append((name, time.perf_counter() - start - queued, ok))
+
+    def note_locator(self, name: str, attempts: int = 1, ok: bool = True):
+        """Counts an interaction with a locator; attempts beyond the first are retries."""
+        counts = self.locators.setdefault(name, [0, 0])
+        counts[0] += attempts
+        counts[1] += attempts - 1 if ok else attempts
+        self.retries += max(attempts - 1, 0)
+
+    def note_queued(self, action: str, seconds: float):
+        """Adds rate limiter wait time; stored as a 'queued:<action>' phase."""
+        self.queued[action] = self.queued.get(action, 0.0) + seconds
+        self._queued_total += seconds
+
+    def finish(self, outcome: str, error: Exception | None = None):
+        self.outcome = outcome
+        self.duration = time.perf_counter() - self._start
+        if error is not None:
+            self.error_message = f"{type(error).__name__}: {error}"[:500]
+
+
+def _connect(db_path: str) -> sqlite3.Connection:
+    """Opens a connection tuned for many short concurrent writers (WAL + busy timeout)."""
+    directory = os.path.dirname(os.path.abspath(db_path))
+    os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=config.RUN_HISTORY_BUSY_TIMEOUT)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    with _init_lock:
+        if db_path not in _initialized_paths:
+            utils.init_sqlite_schema(conn, SCHEMA)
+            _initialized_paths.add(db_path)
+    return conn
+
+
+def save_run(record: RunRecord, db_path: str | None = None) -> int | None:
+    """
+    Appends a run record in a single short transaction.
+
+    Never raises: a broken history store must not fail a profile update.
+
+    Returns:
+        The new run id, or None if recording is disabled or failed.
+    """
+    if not config.RUN_HISTORY_ENABLED:
+        return None
+    db_path = db_path or config.RUN_HISTORY_DB
+    try:
+        conn = _connect(db_path)
+        try:
+            with conn:
+                cursor = conn.execute(
+                    "INSERT INTO runs (started_at, site, account, outcome, duration, retries,"
+                    " bytes_uploaded, error_context, error_message) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (record.started_at, record.site, record.account, record.outcome, record.duration,
+                     record.retries, record.bytes_uploaded, record.error_context, record.error_message),
+                )
+                run_id = cursor.lastrowid
+                conn.executemany(
+                    "INSERT INTO phases (run_id, started_at, site, phase, duration, ok) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(run_id, record.started_at, record.site, name, duration, int(ok))
+                     for name, duration, ok in record.phases]
+                    + [(run_id, record.started_at, record.site, f"queued:{action}", seconds, 1)
+                       for action, seconds in record.queued.items()],
+                )
+                conn.executemany(
+                    "INSERT INTO locators (run_id, started_at, site, locator, attempts, failures) VALUES (?, ?, ?, ?, ?, ?)",
+                    [(run_id, record.started_at, record.site, name, attempts, failures)
+                     for name, (attempts, failures) in record.locators.items()],
+                )
+        finally:
+            conn.close()
+        logging.debug(f"Recorded run {run_id} for {record.site} in {db_path}")
+        return run_id
+    except Exception as e:
+        logging.warning(f"Could not record run history in {db_path}: {e}")
+        return None
+
+
+# --- Reporting ---
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile; values need not be sorted."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100.0 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def phase_percentiles(conn: sqlite3.Connection, since: float) -> list[tuple]:
+    """Returns (site, phase, count, p50, p95, max) for every phase since a timestamp."""
+    durations = {}
+    for site, phase, duration in conn.execute(
+        "SELECT site, phase, duration FROM phases WHERE started_at >= ?", (since,)
+    ):
+        durations.setdefault((site, phase), []).append(duration)
+    return [
+        (site, phase, len(values), percentile(values, 50), percentile(values, 95), max(values))
+        for (site, phase), values in sorted(durations.items())
+    ]
+
+
+def slowest_accounts(conn: sqlite3.Connection, since: float, limit: int = 10) -> list[tuple]:
+    """Returns (site, account, runs, avg_duration, failures) ordered by average run time."""
+    return conn.execute(
+        "SELECT site, account, COUNT(*), AVG(duration), SUM(outcome != 'success')"
+        " FROM runs WHERE started_at >= ? GROUP BY site, account"
+        " ORDER BY AVG(duration) DESC LIMIT ?",
+        (since, limit),
+    ).fetchall()
+
+
+def locator_failure_rates(conn: sqlite3.Connection, since: float) -> list[tuple]:
+    """Returns (site, locator, attempts, failures, failure_rate) ordered by failure rate."""
+    rows = conn.execute(
+        "SELECT site, locator, SUM(attempts), SUM(failures) FROM locators"
+        " WHERE started_at >= ? GROUP BY site, locator",
+        (since,),
+    ).fetchall()
+    rates = [(site, locator, attempts, failures, failures / attempts if attempts else 0.0)
+             for site, locator, attempts, failures in rows]
+    return sorted(rates, key=lambda row: row[4], reverse=True)
+
+
+def detect_regressions(conn: sqlite3.Connection, recent_days: float = None, baseline_days: float = None,
+                       threshold: float = None, min_samples: int = None) -> list[tuple]:
+    """
+    Compares each phase's recent median against its median over the preceding baseline window.
+
+    Returns:
+        (site, phase, baseline_p50, recent_p50, ratio) for every phase whose recent
+        median exceeds the baseline by more than the configured threshold.
+    """
+    recent_days = recent_days if recent_days is not None else config.REGRESSION_RECENT_DAYS
+    baseline_days = baseline_days if baseline_days is not None else config.REGRESSION_BASELINE_DAYS
+    threshold = threshold if threshold is not None else config.REGRESSION_THRESHOLD
+    min_samples = min_samples if min_samples is not None else config.REGRESSION_MIN_SAMPLES
+
+    now = time.time()
+    recent_start = now - recent_days * 86400
+    baseline_start = recent_start - baseline_days * 86400
+
+    baseline, recent = {}, {}
+    for site, phase, started_at, duration in conn.execute(
+        # Pacing waits follow the rate limiter's backoff, not the site's latency
+        "SELECT site, phase, started_at, duration FROM phases WHERE started_at >= ? AND ok = 1"
+        " AND phase NOT LIKE 'queued:%'",
+        (baseline_start,),
+    ):
+        bucket = recent if started_at >= recent_start else baseline
+        bucket.setdefault((site, phase), []).append(duration)
+
+    regressions = []
+    for key, recent_values in sorted(recent.items()):
+        baseline_values = baseline.get(key, [])
+        if len(recent_values) < min_samples or len(baseline_values) < min_samples:
+            continue
+        baseline_p50 = percentile(baseline_values, 50)
+        recent_p50 = percentile(recent_values, 50)
+        if baseline_p50 > 0 and recent_p50 / baseline_p50 > threshold:
+            regressions.append((key[0], key[1], baseline_p50, recent_p50, recent_p50 / baseline_p50))
+    return regressions
+
+
+def log_regressions(db_path: str | None = None):
+    """Logs a warning for every regressed phase. Safe to call after each batch of runs."""
+    if not config.RUN_HISTORY_ENABLED:
+        return
+    db_path = db_path or config.RUN_HISTORY_DB
+    if not os.path.exists(db_path):
+        return
+    try:
+        conn = _connect(db_path)
+        try:
+            for site, phase, baseline_p50, recent_p50, ratio in detect_regressions(conn):
+                logging.warning(f"Latency regression: {site}/{phase} median {baseline_p50:.1f}s -> {recent_p50:.1f}s ({ratio:.1f}x)")
+        finally:
+            conn.close()
+    except Exception as e:
+        logging.warning(f"Could not check run history for regressions: {e}")
+
+
+def print_report(conn: sqlite3.Connection, days: float, top: int):
+    since = time.time() - days * 86400
+    total, failed = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(outcome != 'success'), 0) FROM runs WHERE started_at >= ?", (since,)
+    ).fetchone()
+    print(f"Run history for the last {days:g} days: {total} runs, {failed} failed")
+
+    print("\nPhase latency (seconds):")
+    print(f"  {'site':<12} {'phase':<24} {'n':>6} {'p50':>8} {'p95':>8} {'max':>8}")
+    for site, phase, count, p50, p95, worst in phase_percentiles(conn, since):
+        print(f"  {site:<12} {phase:<24} {count:>6} {p50:>8.1f} {p95:>8.1f} {worst:>8.1f}")
+
+    print(f"\nSlowest accounts (top {top}):")
+    for site, account, runs, avg_duration, failures in slowest_accounts(conn, since, top):
+        print(f"  {site:<12} {account:<36} runs={runs:<4} avg={avg_duration:.1f}s failures={failures}")
+
+    print("\nFailure rate by locator:")
+    for site, locator, attempts, failures, rate in locator_failure_rates(conn, since)[:top]:
+        print(f"  {site:<12} {locator:<36} {failures}/{attempts} ({rate:.0%})")
+
+    regressions = detect_regressions(conn)
+    print("\nRegressions:" if regressions else "\nNo phase latency regressions detected.")
+    for site, phase, baseline_p50, recent_p50, ratio in regressions:
+        print(f"  {site:<12} {phase:<24} {baseline_p50:.1f}s -> {recent_p50:.1f}s ({ratio:.1f}x)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trend and regression reports over recorded update runs.")
+    parser.add_argument("command", choices=("report", "regressions"), nargs="?", default="report")
+    parser.add_argument("--db", default=config.RUN_HISTORY_DB, help="Path to the run history database.")
+    parser.add_argument("--days", type=float, default=30, help="Reporting window in days (report only).")
+    parser.add_argument("--top", type=int, default=10, help="Rows to show in ranked sections.")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"No run history found at {args.db}")
+        return 0
+
+    conn = _connect(args.db)
+    try:
+        if args.command == "report":
+            regressions = print_report(conn, args.days, args.top)
+        else:
+            regressions = detect_regressions(conn)
+            for site, phase, baseline_p50, recent_p50, ratio in regressions:
+                print(f"{site}/{phase}: {baseline_p50:.1f}s -> {recent_p50:.1f}s ({ratio:.1f}x)")
+    finally:
+        conn.close()
+    # Non-zero exit lets a scheduled job fail loudly on a regression
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+# test_account_queue.py
+import argparse
+import sqlite3
+
+import pytest
+
+import account_queue
+from account_queue import Account, AccountQueue
+
+
+class Clock:
+    """Stands in for time.time() so lease expiry can be tested without sleeping."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(account_queue.time, "time", clock)
+    return clock
+
+
+def make_queue(tmp_path, **kwargs):
+    kwargs.setdefault("lease_seconds", 60)
+    kwargs.setdefault("max_attempts", 3)
+    return AccountQueue(str(tmp_path / "queue.db"), "batch-1", **kwargs)
+
+
+def accounts(count, site="Naukri"):
+    return [Account(site, f"user{i}@example.com", "secret") for i in range(count)]
+
+
+def completion_rows(queue):
+    conn = sqlite3.connect(queue.db_path)
+    try:
+        return conn.execute("SELECT site, username, worker, success, attempts FROM completions").fetchall()
+    finally:
+        conn.close()
+
+
+def test_parse_shard():
+    assert account_queue.parse_shard("0/4") == (0, 4)
+    assert account_queue.parse_shard("3/4") == (3, 4)
+    for bad in ("4/4", "-1/4", "0/0", "1", "a/b"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            account_queue.parse_shard(bad)
+
+
+def test_shards_are_stable_and_disjoint():
+    # crc32 does not depend on PYTHONHASHSEED, so every machine agrees on the split
+    assert Account("Naukri", "someone@example.com", None).bucket == 1736284687
+    batch = accounts(50)
+    for count in (1, 3, 7):
+        for account in batch:
+            owners = [index for index in range(count) if account_queue.in_shard(account, (index, count))]
+            assert len(owners) == 1
+    assert all(account_queue.in_shard(account, None) for account in batch)
+
+
+def test_enqueue_is_idempotent(tmp_path, clock):
+    queue = make_queue(tmp_path)
+    assert queue.enqueue(accounts(3)) == 3
+    assert queue.enqueue(accounts(4)) == 1
+
+
+def test_each_account_is_leased_once(tmp_path, clock):
+    queue = make_queue(tmp_path)
+    queue.enqueue(accounts(2))
+    first = queue.lease("w1")
+    second = queue.lease("w2")
+    assert {first, second} == {("Naukri", "user0@example.com"), ("Naukri", "user1@example.com")}
+    assert queue.lease("w3") is None
+    assert queue.next_lease_expiry() == clock.now + 60
+
+
+def test_expired_lease_is_taken_over(tmp_path, clock):
+    queue = make_queue(tmp_path)
+    queue.enqueue(accounts(1))
+    site, username = queue.lease("w1")
+    clock.advance(30)
+    assert queue.lease("w2") is None # Still held by w1
+    clock.advance(31)
+    assert queue.lease("w2") == (site, username)
+
+    # The worker that lost its lease can neither renew nor complete it
+    assert not queue.renew("w1", site, username)
+    assert not queue.complete("w1", site, username, True, 1.0)
+    assert queue.complete("w2", site, username, True, 1.0)
+    assert completion_rows(queue) == [(site, username, "w2", 1, 2)]
+    assert queue.next_lease_expiry() is None
+
+
+def test_success_is_recorded_once(tmp_path, clock):
+    queue = make_queue(tmp_path)
+    queue.enqueue(accounts(1))
+    site, username = queue.lease("w1")
+    assert queue.complete("w1", site, username, True, 1.0)
+    assert not queue.complete("w1", site, username, True, 1.0)
+    assert queue.lease("w1") is None
+    assert completion_rows(queue) == [(site, username, "w1", 1, 1)]
+
+
+def test_failures_are_retried_until_max_attempts(tmp_path, clock):
+    queue = make_queue(tmp_path, max_attempts=2)
+    queue.enqueue(accounts(1))
+    site, username = queue.lease("w1")
+    assert queue.complete("w1", site, username, False, 1.0)
+    assert completion_rows(queue) == [] # Back to pending for another attempt
+
+    assert queue.lease("w2") == (site, username)
+    assert queue.complete("w2", site, username, False, 1.0)
+    assert completion_rows(queue) == [(site, username, "w2", 0, 2)]
+    assert queue.lease("w1") is None
+    assert queue.summary()["statuses"] == {"failed": 1}
+
+
+def test_expired_final_attempt_is_given_up_once(tmp_path, clock):
+    queue = make_queue(tmp_path, max_attempts=1)
+    queue.enqueue(accounts(1))
+    site, username = queue.lease("w1")
+    clock.advance(61) # w1 died holding its only attempt
+    assert queue.lease("w2") is None
+    assert queue.lease("w3") is None
+    assert completion_rows(queue) == [(site, username, "w1", 0, 1)]
+    assert queue.next_lease_expiry() is None
+
+
+def test_unknown_accounts_are_left_for_other_workers(tmp_path, clock):
+    queue = make_queue(tmp_path)
+    mine, theirs = accounts(1), accounts(1, site="Other")
+    queue.enqueue(mine + theirs)
+    known = {account.key for account in mine}
+
+    assert queue.lease("w1", known=known) == ("Naukri", "user0@example.com")
+    assert queue.lease("w1", known=known) is None
+    assert queue.lease("w2") == ("Other", "user0@example.com")
+    conn = sqlite3.connect(queue.db_path)
+    try:
+        # w1 skipped the account without using up any of its attempts
+        assert conn.execute("SELECT attempts FROM queue WHERE site = 'Other'").fetchone() == (1,)
+    finally:
+        conn.close()
+
+    # w1 only waits for leases on accounts it could take over
+    assert queue.complete("w1", "Naukri", "user0@example.com", True, 1.0)
+    assert queue.next_lease_expiry(known=known) is None
+    assert queue.next_lease_expiry() == clock.now + 60
+
+
+def test_lease_respects_shard(tmp_path, clock):
+    queue = make_queue(tmp_path)
+    batch = accounts(20)
+    queue.enqueue(batch)
+    leased = set()
+    while (claimed := queue.lease("w1", shard=(1, 3))) is not None:
+        leased.add(claimed)
+    assert leased == {(a.site, a.username) for a in batch if account_queue.in_shard(a, (1, 3))}
+
+
+def test_summary_does_not_create_the_queue(tmp_path):
+    queue = AccountQueue(str(tmp_path / "missing.db"), "batch-1", create=False)
+    with pytest.raises(sqlite3.OperationalError):
+        queue.summary()
+    assert not (tmp_path / "missing.db").exists()
@@ -1,6 +1,8 @@
 import os
 import glob
 import logging
+import sqlite3
+import time
 from datetime import datetime
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -42,6 +44,24 @@ def find_latest_resume(folder_path: str) -> str | None:
         logging.error(f"Error finding latest resume: {e}")
         return None
 
+def init_sqlite_schema(conn: sqlite3.Connection, schema: str, wal: bool = True, attempts: int = 50):
+    """
+    Creates a schema, first switching the database to WAL mode if requested.
+
+    Changing the journal mode does not honour the busy timeout, so processes opening
+    a new database at the same moment retry here instead of failing with "locked".
+    """
+    for attempt in range(attempts):
+        try:
+            if wal and conn.execute("PRAGMA journal_mode").fetchone()[0] != "wal":
+                conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(schema)
+            return
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) or attempt == attempts - 1:
+                raise
+            time.sleep(0.1)
+
 def toggle_full_stop(text: str) -> str:
     """Adds a full stop if one doesn't exist at the end, or removes it if it does."""
     if not text:
@@ -4,7 +4,6 @@ from abc import ABC, abstractmethod
 from selenium import webdriver
 from selenium.webdriver.remote.webdriver import WebDriver
 from selenium.webdriver.chrome.service import Service as ChromeService
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.chrome.options import Options as ChromeOptions
 # from selenium.webdriver.firefox.service import Service as FirefoxService # Uncomment if using Firefox
 # from webdriver_manager.firefox import GeckoDriverManager # Uncomment if using Firefox
@@ -22,32 +21,71 @@ from selenium.webdriver.common.by import By # Import By for locator tuple struct
 # Import config and utils later to avoid potential circular dependencies
 import config
 import utils
+import run_history
+import rate_limiter
+
+BROWSER_ENGINES = ("selenium", "cdp")
 
 class WebUpdater(ABC):
     """Abstract base class for website profile updaters."""
 
-    def __init__(self, username, password, headless=True):
+    site_name = "Generic" # Overridden by subclasses; used as the site key in run history
+
+    def __init__(self, username, password, headless=True, engine=None):
         self.username = username
         self.password = password
         self.headless = headless
+        self.engine = (engine or config.BROWSER_ENGINE).lower()
+        if self.engine not in BROWSER_ENGINES:
+            raise ValueError(f"Unknown browser engine '{self.engine}'. Expected one of: {', '.join(BROWSER_ENGINES)}")
         self.driver = None
+        self.locators = None
+        self.run_record = run_history.RunRecord(self.site_name, username)
+
+    def _chrome_arguments(self) -> list[str]:
+        """Command-line switches shared by both browser engines."""
+        arguments = [
+            "--no-sandbox",
+            "--disable-dev-shm-usage",
+            "--disable-gpu",
+            "--window-size=1920,1080",
+            # "--disable-blink-features=AutomationControlled", # May help avoid detection
+        ]
+        if self.headless:
+            arguments.insert(0, "--headless=new") # Recommended new headless mode
+        return arguments
 
-    def _init_driver(self) -> WebDriver:
+    def _init_driver(self):
+        """Initializes the browser driver for the configured engine."""
+        if self.engine == "cdp":
+            return self._init_cdp_driver()
+        return self._init_selenium_driver()
+
+    def _init_cdp_driver(self):
+        """Starts Chrome and connects to it directly over the DevTools Protocol."""
+        logging.info("Initializing CDP driver...")
+        from cdp_driver import CdpDriver # Imported here so the selenium engine does not need websocket-client
+        try:
+            driver = CdpDriver(headless=self.headless, arguments=self._chrome_arguments())
+            driver.implicitly_wait(config.IMPLICIT_WAIT_TIME)
+            logging.info("CDP driver initialized successfully (Chrome).")
+            return driver
+        except Exception as e:
+            logging.error(f"Failed to initialize CDP driver: {e}", exc_info=True)
+            raise RuntimeError("Could not initialize CDP driver.") from e
+
+    def _init_selenium_driver(self) -> WebDriver:
         """Initializes the Selenium WebDriver."""
         logging.info("Initializing WebDriver...")
         options = ChromeOptions()
-        if self.headless:
-            options.add_argument("--headless=new") # Recommended new headless mode
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--window-size=1920,1080")
+        for argument in self._chrome_arguments():
+            options.add_argument(argument)
         options.add_experimental_option('excludeSwitches', ['enable-logging'])
-        # options.add_argument("--disable-blink-features=AutomationControlled") # May help avoid detection
         # options.add_experimental_option('useAutomationExtension', False) # May help avoid detection
 
         try:
             logging.info("Setting up ChromeDriver using webdriver-manager...")
+            from webdriver_manager.chrome import ChromeDriverManager # Only the selenium engine needs a chromedriver download
             service = ChromeService(ChromeDriverManager().install())
             driver = webdriver.Chrome(service=service, options=options)
             driver.implicitly_wait(config.IMPLICIT_WAIT_TIME)
@@ -78,26 +116,54 @@ class WebUpdater(ABC):
         pass
 
     def run_update(self):
-        """Executes the full update process."""
+        """Executes the full update process and records it in the run history."""
+        self.run_record = run_history.RunRecord(self.site_name, self.username)
+        try:
+            success = self._run_update()
+        finally:
+            if self.run_record.outcome == "unknown":
+                self.run_record.finish("failure")
+            run_history.save_run(self.run_record)
+        return success
+
+    def _run_update(self):
         if not self.username or not self.password:
              logging.error(f"Missing username or password for {self.__class__.__name__}.")
+             self.run_record.error_context = "missing_credentials"
              return False
 
         latest_resume = utils.find_latest_resume(config.RESUME_FOLDER)
         if not latest_resume:
             logging.error("Mandatory step failed: Could not find resume to upload.")
+            self.run_record.error_context = "resume_not_found"
             return False
 
         self.driver = None
+        record = self.run_record
         try:
-            self.driver = self._init_driver()
-            self.login()
-            self.navigate_to_profile()
-            self.update_optional_fields()
-            self.update_resume(latest_resume)
+            with record.phase("init_driver"):
+                self.driver = self._init_driver()
+            with record.phase("login"):
+                self.login()
+            with record.phase("navigate_to_profile"):
+                self.navigate_to_profile()
+            with record.phase("update_optional_fields"):
+                self.update_optional_fields()
+            with record.phase("update_resume"):
+                self.update_resume(latest_resume)
             logging.info(f"Update process completed successfully for {self.__class__.__name__}.")
+            record.finish("success")
+            rate_limiter.report_ok(self.site_name)
             return True
         except Exception as e:
+            record.finish("failure", e)
+            # Slow this site down for every worker on the node if it is pushing back. Locator timeouts
+            # and driver errors say nothing about the site's limits; a throttling page or a login that
+            # was submitted but never reached the dashboard (a silent bot rejection) does
+            if self._page_looks_throttled():
+                rate_limiter.report_throttled(self.site_name, "throttling page")
+            elif record.error_context == "login_confirmation_timeout":
+                rate_limiter.report_throttled(self.site_name, "login failure")
             # Error logging is now more specific within the methods that fail
             # The exception will propagate here if not handled locally
             logging.error(f"An unhandled error occurred during the update process for {self.__class__.__name__}: {e}", exc_info=True)
@@ -111,16 +177,87 @@ class WebUpdater(ABC):
                 self.driver.quit()
 
     # --- Helper methods for subclasses ---
-    def safe_find_element(self, locator, timeout=config.EXPLICIT_WAIT_TIME):
-        """Finds an element, waiting for visibility."""
+    def _locator_name(self, locator):
+        """Returns the attribute name of a locator in self.locators (e.g. 'LOGIN_BUTTON'), or its repr."""
+        if self.locators is not None:
+            for name, value in vars(self.locators).items():
+                if value == locator:
+                    return name
+        return f"{locator[0]}={locator[1]}"
+
+    def _locators_name(self, locators):
+        return " | ".join(self._locator_name(locator) for locator in locators)
+
+    def _note_locator(self, locator, attempts=1, ok=True):
+        self.run_record.note_locator(self._locator_name(locator), attempts, ok)
+
+    def pace(self, action):
+        """Waits for the shared rate limiter before a login, page load, save or upload."""
+        waited = rate_limiter.acquire(self.site_name, action)
+        self.run_record.note_queued(action, waited)
+
+    def _page_looks_throttled(self):
+        """True if the current page shows a rate-limit, CAPTCHA or block message (see config.THROTTLE_MARKERS)."""
+        if not self.driver:
+            return False
+        try:
+            page_text = self.driver.execute_script(
+                "return (document.title + ' ' + (document.body ? document.body.innerText.slice(0, 5000) : '')).toLowerCase();"
+            ) or ""
+        except Exception:
+            return False
+        return any(marker in page_text for marker in config.THROTTLE_MARKERS)
+
+    def wait_for(self, locator, condition="visible", timeout=config.EXPLICIT_WAIT_TIME, record=False):
+        """
+        Waits for a locator to be 'present', 'visible' or 'clickable' and returns the element.
+
+        The CDP engine waits inside the page (one round trip, woken by DOM mutations);
+        the selenium engine polls through WebDriverWait. Raises TimeoutException either way.
+        Set record=True to count the wait in the run history's locator report.
+        """
         try:
-            wait = WebDriverWait(self.driver, timeout)
-            element = wait.until(EC.visibility_of_element_located(locator))
-            logging.debug(f"Found visible element with locator: {locator}")
-            return element
+            if self.engine == "cdp":
+                element = self.driver.wait_for(locator, condition, timeout)
+            else:
+                element = WebDriverWait(self.driver, timeout).until(self._expected_condition(condition)(locator))
         except TimeoutException:
-            # Logged with more context in the calling function usually
-            raise # Re-raise to be caught by caller
+            if record:
+                self._note_locator(locator, ok=False)
+            raise
+        if record:
+            self._note_locator(locator)
+        return element
+
+    def wait_for_any(self, locators, condition="visible", timeout=config.EXPLICIT_WAIT_TIME, record=False):
+        """Like wait_for, but returns as soon as any one of several locators is ready. Recorded as one entry."""
+        try:
+            if self.engine == "cdp":
+                element = self.driver.wait_for_any(locators, condition, timeout)
+            else:
+                expected = self._expected_condition(condition)
+                element = WebDriverWait(self.driver, timeout).until(EC.any_of(*(expected(locator) for locator in locators)))
+        except TimeoutException:
+            if record:
+                self.run_record.note_locator(self._locators_name(locators), ok=False)
+            raise
+        if record:
+            self.run_record.note_locator(self._locators_name(locators))
+        return element
+
+    @staticmethod
+    def _expected_condition(condition):
+        return {
+            "present": EC.presence_of_element_located,
+            "visible": EC.visibility_of_element_located,
+            "clickable": EC.element_to_be_clickable,
+        }[condition]
+
+    def safe_find_element(self, locator, timeout=config.EXPLICIT_WAIT_TIME, record=True):
+        """Finds an element, waiting for visibility. Set record=False when the caller records the interaction itself."""
+        element = self.wait_for(locator, "visible", timeout, record=record) # Timeouts are logged with more context by the caller
+        logging.debug(f"Found visible element with locator: {locator}")
+        return element
 
     def safe_click(self, locator, timeout=config.EXPLICIT_WAIT_TIME):
         """Clicks an element safely, waiting for clickability, with retries and JS fallback."""
@@ -128,11 +265,11 @@ class WebUpdater(ABC):
         last_exception = None
         for i in range(retries):
             try:
-                wait = WebDriverWait(self.driver, timeout)
-                element = wait.until(EC.element_to_be_clickable(locator))
+                element = self.wait_for(locator, "clickable", timeout)
                 logging.debug(f"Attempting to click element: {locator} (Attempt {i+1})")
                 element.click()
                 time.sleep(1) # Pause after click
+                self._note_locator(locator, attempts=i + 1)
                 return # Success
             except StaleElementReferenceException as e:
                 logging.warning(f"StaleElementReferenceException clicking {locator}, attempt {i+1}/{retries}. Retrying...")
@@ -143,10 +280,11 @@ class WebUpdater(ABC):
                  last_exception = e
                  try:
                      # Find presence first for JS click
-                     element_for_js = WebDriverWait(self.driver, timeout).until(EC.presence_of_element_located(locator))
+                     element_for_js = self.wait_for(locator, "present", timeout)
                      self.driver.execute_script("arguments[0].click();", element_for_js)
                      logging.info(f"JavaScript click executed for {locator}.")
                      time.sleep(1)
+                     self._note_locator(locator, attempts=i + 1)
                      return # Success
                  except Exception as js_click_err:
                       logging.error(f"JavaScript click also failed for {locator}: {js_click_err}")
@@ -163,6 +301,7 @@ class WebUpdater(ABC):
 
         # If loop finishes
         logging.error(f"Failed to click {locator} after {retries} retries.")
+        self._note_locator(locator, attempts=retries, ok=False)
         if last_exception:
             raise last_exception # Raise the specific error encountered
         else:
@@ -175,8 +314,8 @@ class WebUpdater(ABC):
         last_exception = None
         for i in range(retries):
             try:
-                element = self.safe_find_element(locator, timeout) # Ensures visibility first
-                element = WebDriverWait(self.driver, timeout).until(EC.element_to_be_clickable(locator)) # Then check clickability/enabled
+                element = self.safe_find_element(locator, timeout, record=False) # Ensures visibility first
+                element = self.wait_for(locator, "clickable", timeout) # Then check clickability/enabled
 
                 logging.debug(f"Sending keys to element: {locator} (Attempt {i+1})")
                 if clear_first:
@@ -184,6 +323,7 @@ class WebUpdater(ABC):
                     time.sleep(0.3) # Pause after clear
                 element.send_keys(text)
                 time.sleep(0.5) # Pause after sending keys
+                self._note_locator(locator, attempts=i + 1)
                 return # Success
             except StaleElementReferenceException as e:
                 logging.warning(f"StaleElementReferenceException sending keys to {locator}, attempt {i+1}/{retries}. Retrying...")
@@ -200,6 +340,7 @@ class WebUpdater(ABC):
 
         # If loop finishes
         logging.error(f"Failed to send keys to {locator} after {retries} retries.")
+        self._note_locator(locator, attempts=retries, ok=False)
         if last_exception:
             raise last_exception
         else:
@@ -217,9 +358,7 @@ class WebUpdater(ABC):
                 # Wait for visibility using safe_find_element
                 text_element = self.safe_find_element(text_area_locator, timeout=config.EXPLICIT_WAIT_TIME + 5)
                  # Additionally wait for clickability/enabled state
-                text_element = WebDriverWait(self.driver, config.EXPLICIT_WAIT_TIME).until(
-                     EC.element_to_be_clickable(text_area_locator)
-                )
+                text_element = self.wait_for(text_area_locator, "clickable", config.EXPLICIT_WAIT_TIME)
                 logging.info(f"Text area {text_area_locator} located and ready.")
             except Exception as e:
                 logging.error(f"Failed to find or make ready the text area {text_area_locator} after clicking edit.")
@@ -235,6 +374,7 @@ class WebUpdater(ABC):
                 time.sleep(0.5)
 
                 logging.debug(f"Attempting to click save button: {save_button_locator}")
+                self.pace("save")
                 self.safe_click(save_button_locator)
                 logging.info(f"Clicked save button for field.")
                 # Wait for potential modal close or confirmation message (adjust as needed)